@@ -5,25 +5,45 @@ This example shows how to use session memory to maintain conversation history
 across multiple agent runs without manually handling .to_input_list().
 """
 
+import asyncio
 import os
+import time
 from typing import Any, Dict
 
-from agents import Agent, OpenAIConversationsSession, Runner
+import httpx
+from agents import (
+    Agent,
+    OpenAIConversationsSession,
+    Runner,
+    set_default_openai_client,
+)
 from agents.mcp import MCPServerStreamableHttp
 from agents.model_settings import ModelSettings
 from dotenv import load_dotenv
+from openai import AsyncOpenAI
 
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
+INICIO_PROCESO = time.perf_counter()
+
 load_dotenv()
 
 app = FastAPI(title="Asistente VuelaConNosotros API")
 
+# Single OpenAI client shared by the agent and the session, so the HTTP
+# connection pool primed on startup is the one real requests use.
+openai_client = AsyncOpenAI()
+set_default_openai_client(openai_client)
+
 # Shared objects initialized on startup
 server: MCPServerStreamableHttp | None = None
 agent: Agent | None = None
-session = OpenAIConversationsSession()
+session = OpenAIConversationsSession(openai_client=openai_client)
+
+# Startup state reported by /ready
+startup: Dict[str, Any] = {"ready": False, "phases_ms": {}}
 
 with open("prompt.txt", "r", encoding="utf-8") as f:
     prompt = f.read()
@@ -34,10 +54,66 @@ class ChatRequest(BaseModel):
     message: str
 
 
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 3)
+
+
+async def wait_for_mcp_ready() -> None:
+    """Poll the MCP server's /ready endpoint with backoff until it returns 200.
+
+    The MCP client cannot simply be retried on failure (a refused connection
+    cancels the caller's task), so readiness is checked over plain HTTP first.
+    The URL defaults to ``URL_MCP`` with ``/mcp`` replaced by ``/ready`` and can
+    be overridden with ``URL_MCP_READY``. Gives up after
+    ``MCP_STARTUP_TIMEOUT`` seconds (default 60).
+    """
+    url_mcp = os.getenv("URL_MCP", "http://0.0.0.0:8000/mcp")
+    url_ready = os.getenv("URL_MCP_READY", url_mcp.rsplit("/mcp", 1)[0] + "/ready")
+    deadline = time.monotonic() + float(os.getenv("MCP_STARTUP_TIMEOUT", "60"))
+    delay = 0.5
+    async with httpx.AsyncClient(timeout=5) as client:
+        while True:
+            try:
+                if (await client.get(url_ready)).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() + delay > deadline:
+                raise RuntimeError(f"MCP server not ready at {url_ready}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 5.0)
+
+
+async def prime_openai_pool() -> None:
+    """Open the connection to the OpenAI API ahead of the first request.
+
+    A failure here is not fatal: the first request will simply pay for the
+    connection setup.
+    """
+    try:
+        # Short timeout and no retries: a slow or unreachable API must not
+        # hold up startup.
+        await openai_client.with_options(timeout=5, max_retries=0).models.list()
+    except Exception as e:
+        print(f"Could not prime the OpenAI connection pool: {e}")
+
+
 @app.on_event("startup")
 async def startup_event() -> None:
-    """Initialize MCP server and Agent on application startup."""
+    """Initialize MCP server and Agent on application startup.
+
+    Warm-up phases (timed and reported by /ready): wait for MCP to be ready,
+    connect and fetch its tool list, build the agent, and prime the OpenAI
+    HTTP pool.
+    """
     global server, agent
+    phases = startup["phases_ms"]
+
+    start = time.perf_counter()
+    await wait_for_mcp_ready()
+    phases["mcp_wait"] = _elapsed_ms(start)
+
+    start = time.perf_counter()
     # create and enter the MCP server context so it's available for requests
     server = MCPServerStreamableHttp(
         name="Streamable HTTP Python Server",
@@ -48,15 +124,27 @@ async def startup_event() -> None:
         cache_tools_list=True,
         max_retry_attempts=3,
     )
-    # enter async context
+    # enter async context and pre-fetch the (cached) tool list
     await server.__aenter__()
+    await server.list_tools()
+    phases["mcp_tools"] = _elapsed_ms(start)
 
+    start = time.perf_counter()
     agent = Agent(
         name="Asistente VuelaConNosotros",
         instructions=prompt,
         mcp_servers=[server],
         model_settings=ModelSettings(tool_choice="required"),
     )
+    phases["agent"] = _elapsed_ms(start)
+
+    start = time.perf_counter()
+    await prime_openai_pool()
+    phases["openai_pool"] = _elapsed_ms(start)
+
+    startup["startup_ms"] = _elapsed_ms(INICIO_PROCESO)
+    startup["ready"] = True
+    print(f"Agent ready in {startup['startup_ms']} ms: {phases}")
 
 
 @app.on_event("shutdown")
@@ -70,6 +158,16 @@ async def shutdown_event() -> None:
             pass
 
 
+@app.get("/ready")
+async def ready_endpoint() -> JSONResponse:
+    """Return 200 with the warm-up timings.
+
+    Uvicorn only binds the port after the startup event, so connections are
+    refused while warming up; 503 is only served if the app runs without it.
+    """
+    return JSONResponse(startup, status_code=200 if startup["ready"] else 503)
+
+
 @app.post("/chat")
 async def chat_endpoint(payload: ChatRequest) -> Dict[str, Any]:
     """Accepts JSON {message: str} and returns {output: str, raw: ...}.
@@ -0,0 +1,217 @@
+"""Benchmark de throughput de reservas frente al número de fragmentos.
+
+Para cada número de fragmentos levanta localmente ``n`` procesos `main.py`
+(cada uno con su propia base SQLite y ``VCN_FRAGMENTO=i/n``) más un proceso
+`enrutador.py`, y lanza reservas concurrentes de dos formas: a través del
+enrutador y con enrutamiento en el cliente (cada reserva va directa al
+fragmento dueño). Al final imprime las reservas por segundo de cada
+configuración.
+
+El coste por llamada lo domina la pila HTTP/MCP más que SQLite, así que el
+enrutador es un proceso más que puede saturarse; la columna "directo" mide
+el techo que dan los fragmentos por sí solos. Para que las cifras escalen
+con el número de fragmentos la máquina necesita al menos tantos núcleos
+como procesos.
+
+Uso::
+
+    uv run python bench_fragmentos.py --fragmentos 1 2 4 --reservas 2000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+from typing import Dict, List, Tuple
+
+from fastmcp import Client
+
+from fragmentos import es_propio, indice_fragmento, origen_de_vuelo, podar_fragmento
+from ingesta import ingerir_actualizaciones
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+ORIGENES = ["PSO", "ASU", "BOG", "MDE", "CLO", "CTG", "LIM", "UIO", "SCL", "EZE", "GRU", "MEX"]
+
+
+def vuelos_sinteticos(por_origen: int) -> List[Dict[str, object]]:
+    """Genera `por_origen` vuelos de hoy para cada origen de `ORIGENES`."""
+    hoy = date.today().isoformat()
+    vuelos = []
+    for origen in ORIGENES:
+        for n in range(por_origen):
+            destino = ORIGENES[(ORIGENES.index(origen) + 1 + n) % len(ORIGENES)]
+            vuelos.append(
+                {
+                    "vuelo": f"{origen}-{destino}-{n:03d}",
+                    "estado": "Programado",
+                    "origen": origen,
+                    "destino": destino,
+                    "fecha": hoy,
+                    "hora": 600 + n,
+                }
+            )
+    return vuelos
+
+
+def preparar_base(ruta: str, indice: int, total: int, vuelos: List[Dict[str, object]]) -> None:
+    """Crea la base de un fragmento con el esquema inicial y sus vuelos propios."""
+    conn = sqlite3.connect(ruta)
+    try:
+        with open(os.path.join(DIRECTORIO, "inicial.sql"), "r", encoding="utf-8") as f:
+            conn.executescript(f.read())
+        podar_fragmento(conn, indice, total)
+        ingerir_actualizaciones(
+            (v for v in vuelos if es_propio(v["origen"], (indice, total))), conn
+        )
+    finally:
+        conn.close()
+
+
+def puerto_libre() -> int:
+    """Devuelve un puerto TCP libre en localhost."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def esperar_puerto(puerto: int, limite: float = 30.0) -> None:
+    """Espera a que un proceso acepte conexiones en `puerto`."""
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        try:
+            with socket.create_connection(("127.0.0.1", puerto), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError(f"Nadie escucha en el puerto {puerto}")
+
+
+def lanzar(script: str, entorno: Dict[str, str]) -> subprocess.Popen:
+    """Lanza `script` de este directorio como proceso hijo con `entorno` añadido."""
+    return subprocess.Popen(
+        [sys.executable, script],
+        cwd=DIRECTORIO,
+        env={**os.environ, **entorno},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+async def generar_carga(
+    urls: List[str], tareas: List[Tuple[str, int]], concurrencia: int
+) -> float:
+    """Ejecuta las reservas de `tareas` con `concurrencia` trabajadores y devuelve los segundos.
+
+    Si `urls` tiene una sola URL todas las llamadas van a ella (enrutador); si
+    tiene varias, cada reserva se envía al fragmento dueño del vuelo.
+    """
+    cola: asyncio.Queue = asyncio.Queue()
+    for tarea in tareas:
+        cola.put_nowait(tarea)
+
+    async def trabajador(id_trabajador: int) -> None:
+        clientes = [Client(url) for url in urls]
+        for cliente in clientes:
+            await cliente.__aenter__()
+        try:
+            while not cola.empty():
+                vuelo, asiento = cola.get_nowait()
+                cliente = clientes[indice_fragmento(origen_de_vuelo(vuelo), len(clientes))]
+                await cliente.call_tool(
+                    "reservar_vuelo",
+                    {
+                        "vuelo": vuelo,
+                        "numero_asiento": asiento,
+                        "id_pasajero": f"BENCH{id_trabajador}",
+                    },
+                )
+        finally:
+            for cliente in clientes:
+                await cliente.__aexit__(None, None, None)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajador(i) for i in range(concurrencia)))
+    return time.perf_counter() - inicio
+
+
+def medir(
+    total: int, reservas: int, concurrencia: int, por_origen: int
+) -> Tuple[float, float]:
+    """Levanta `total` fragmentos y un enrutador, y devuelve reservas por segundo.
+
+    Returns:
+        tuple[float, float]: Reservas por segundo vía enrutador y directas.
+    """
+    vuelos = vuelos_sinteticos(por_origen)
+    procesos = []
+    with tempfile.TemporaryDirectory() as directorio:
+        try:
+            urls = []
+            for indice in range(total):
+                ruta = os.path.join(directorio, f"vuelos_{indice}.db")
+                preparar_base(ruta, indice, total, vuelos)
+                puerto = puerto_libre()
+                procesos.append(
+                    lanzar(
+                        "main.py",
+                        {
+                            "VCN_DB": ruta,
+                            "VCN_FRAGMENTO": f"{indice}/{total}",
+                            "VCN_DIR_ARCHIVO": os.path.join(directorio, f"archivo_{indice}"),
+                            "PUERTO": str(puerto),
+                        },
+                    )
+                )
+                urls.append(f"http://127.0.0.1:{puerto}/mcp")
+                esperar_puerto(puerto)
+
+            puerto = puerto_libre()
+            procesos.append(
+                lanzar("enrutador.py", {"VCN_FRAGMENTOS": ",".join(urls), "PUERTO": str(puerto)})
+            )
+            esperar_puerto(puerto)
+
+            # Cada reserva usa un asiento distinto para medir escrituras reales.
+            tareas = [
+                (random.choice(vuelos)["vuelo"], 1000 + n) for n in range(2 * reservas)
+            ]
+            via_enrutador = asyncio.run(
+                generar_carga(
+                    [f"http://127.0.0.1:{puerto}/mcp"], tareas[:reservas], concurrencia
+                )
+            )
+            directo = asyncio.run(generar_carga(urls, tareas[reservas:], concurrencia))
+        finally:
+            for proceso in procesos:
+                proceso.terminate()
+            for proceso in procesos:
+                proceso.wait()
+    return reservas / via_enrutador, reservas / directo
+
+
+def main() -> None:
+    """Punto de entrada de la línea de comandos."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fragmentos", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--reservas", type=int, default=2000)
+    parser.add_argument("--concurrencia", type=int, default=32)
+    parser.add_argument("--vuelos-por-origen", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'fragmentos':>10} | {'enrutador/s':>11} | {'directo/s':>10}")
+    for total in args.fragmentos:
+        via_enrutador, directo = medir(
+            total, args.reservas, args.concurrencia, args.vuelos_por_origen
+        )
+        print(f"{total:>10} | {via_enrutador:>11.1f} | {directo:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+"""Enrutador MCP para el despliegue fragmentado de `mcp_vcn`.
+
+Expone las mismas herramientas que `main.py`, pero en lugar de abrir una base
+de datos reenvía cada llamada a la instancia (fragmento) dueña del vuelo o de
+la ruta consultada. Los fragmentos se configuran con la variable de entorno
+``VCN_FRAGMENTOS``: lista de URLs MCP separadas por comas, en orden de índice
+(la URL en la posición ``i`` debe ejecutarse con ``VCN_FRAGMENTO=i/n``).
+
+Las búsquedas que no pueden asociarse a un fragmento (por ejemplo un número
+de vuelo sin el formato ``ORIGEN-DESTINO-NUMERO``) se reparten en paralelo
+entre todos los fragmentos.
+
+Al arrancar, el enrutador abre en segundo plano la sesión con cada fragmento
+(reintentando hasta que todos respondan) y precarga su lista de herramientas;
+``GET /ready`` devuelve 200 solo cuando eso terminó.
+
+Como el enrutador habla el mismo protocolo que un `mcp_vcn` individual, el
+agente no necesita cambios: basta con apuntar ``URL_MCP`` al enrutador.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from fastmcp import Client, FastMCP
+from fastmcp.exceptions import ToolError
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+import perfilador
+from fragmentos import indice_fragmento, origen_de_vuelo
+
+URLS_FRAGMENTOS = [
+    url.strip()
+    for url in os.getenv("VCN_FRAGMENTOS", "http://localhost:8010/mcp").split(",")
+    if url.strip()
+]
+
+INICIO_PROCESO = time.perf_counter()
+
+mcp = FastMCP(name="vuela-con-nosotros-enrutador")
+
+# Estado del arranque expuesto en /ready.
+arranque: Dict[str, Any] = {"listo": False, "fragmentos_ms": {}}
+
+_clientes = [Client(url) for url in URLS_FRAGMENTOS]
+_conectados: set = set()
+# Un lock por fragmento: abrir la sesión de uno no bloquea a los demás.
+_locks = [asyncio.Lock() for _ in URLS_FRAGMENTOS]
+# Generación de la sesión de cada fragmento, para reconectar una sola vez
+# aunque varias llamadas concurrentes fallen con la misma sesión.
+_sesiones = [0] * len(URLS_FRAGMENTOS)
+
+
+async def _cliente(indice: int) -> Client:
+    """Devuelve el cliente del fragmento, abriendo su sesión la primera vez.
+
+    Las sesiones se mantienen abiertas durante toda la vida del proceso para no
+    repetir el saludo MCP en cada llamada.
+    """
+    if indice not in _conectados:
+        async with _locks[indice]:
+            if indice not in _conectados:
+                await _clientes[indice].__aenter__()
+                _conectados.add(indice)
+    return _clientes[indice]
+
+
+async def _descartar_sesion(indice: int, sesion: int) -> None:
+    """Cierra la sesión `sesion` de un fragmento para que la siguiente llamada la reabra.
+
+    Si otra llamada ya la descartó (la generación cambió) no hace nada.
+    """
+    async with _locks[indice]:
+        if _sesiones[indice] != sesion:
+            return
+        _sesiones[indice] += 1
+        _conectados.discard(indice)
+        try:
+            await _clientes[indice].close()
+        except Exception:
+            # La sesión ya estaba rota; solo interesa liberar su estado.
+            pass
+
+
+async def _llamar(
+    indice: int, herramienta: str, argumentos: Dict[str, Any], idempotente: bool = True
+) -> Dict[str, Any]:
+    """Llama a una herramienta en un fragmento y devuelve su diccionario de resultado.
+
+    Si la sesión no puede abrirse, la petición no llegó al fragmento y se
+    reintenta la apertura una vez. Si la llamada falla ya enviada (por ejemplo,
+    el fragmento se reinició), se descarta la sesión y solo se repite la
+    llamada si es `idempotente`: una reserva o una eliminación pudo haberse
+    confirmado aunque se perdiera la respuesta, y repetirla devolvería un
+    error falso ("Asiento ya reservado", "Reserva no encontrada"). Los errores
+    de la propia herramienta nunca se reintentan.
+    """
+    sesion = _sesiones[indice]
+    try:
+        cliente = await _cliente(indice)
+    except Exception:
+        # Todavía no se envió nada: reintentar la apertura es siempre seguro.
+        cliente = await _cliente(indice)
+    try:
+        resultado = await cliente.call_tool(herramienta, argumentos)
+        return resultado.data
+    except ToolError:
+        raise
+    except Exception:
+        await _descartar_sesion(indice, sesion)
+        if not idempotente:
+            raise
+    # Llamada de lectura: se repite una sola vez con una sesión nueva.
+    return await _llamar(indice, herramienta, argumentos, idempotente=False)
+
+
+async def _llamar_todos(
+    herramienta: str, argumentos: Dict[str, Any], idempotente: bool = True
+) -> List[Dict[str, Any]]:
+    """Llama a una herramienta en todos los fragmentos en paralelo.
+
+    Los fragmentos que fallan devuelven ``{"error": "mensaje"}`` en su posición
+    para que un fragmento caído no impida responder con los demás.
+    `idempotente` tiene el mismo significado que en `_llamar`.
+    """
+    resultados = await asyncio.gather(
+        *(
+            _llamar(i, herramienta, argumentos, idempotente)
+            for i in range(len(_clientes))
+        ),
+        return_exceptions=True,
+    )
+    return [
+        {"error": str(r)} if isinstance(r, Exception) else r for r in resultados
+    ]
+
+
+async def _fragmento_de_vuelo(vuelo: str) -> Optional[int]:
+    """Resuelve qué fragmento es dueño de un vuelo.
+
+    Si el número de vuelo incluye el origen se resuelve localmente; si no, se
+    consulta el estado del vuelo en todos los fragmentos a la vez.
+    """
+    origen = origen_de_vuelo(vuelo)
+    if origen is not None:
+        return indice_fragmento(origen, len(_clientes))
+    resultados = await _llamar_todos("estado_vuelo", {"vuelo": vuelo})
+    for indice, resultado in enumerate(resultados):
+        if resultado.get("estado") not in (None, "Desconocido"):
+            return indice
+    return None
+
+
+async def calentar() -> None:
+    """Conecta con todos los fragmentos y precarga su lista de herramientas.
+
+    Reintenta cada fragmento con espera creciente hasta que responda, ya que
+    pueden arrancar después que el enrutador.
+    """
+    for indice in range(len(_clientes)):
+        inicio = time.perf_counter()
+        espera = 0.5
+        while True:
+            sesion = _sesiones[indice]
+            try:
+                await (await _cliente(indice)).list_tools()
+                break
+            except Exception:
+                await _descartar_sesion(indice, sesion)
+                await asyncio.sleep(espera)
+                espera = min(espera * 2, 5.0)
+        arranque["fragmentos_ms"][URLS_FRAGMENTOS[indice]] = round(
+            (time.perf_counter() - inicio) * 1000, 3
+        )
+    arranque["arranque_ms"] = round((time.perf_counter() - INICIO_PROCESO) * 1000, 3)
+    arranque["listo"] = True
+    print(f"Enrutador listo en {arranque['arranque_ms']} ms: {arranque['fragmentos_ms']}")
+
+
+@mcp.custom_route("/ready", methods=["GET"])
+async def ready(_: Request) -> JSONResponse:
+    """Devuelve 200 cuando todos los fragmentos respondieron y 503 mientras tanto."""
+    return JSONResponse(arranque, status_code=200 if arranque["listo"] else 503)
+
+
+async def principal() -> None:
+    """Arranca el servidor HTTP y el calentamiento de fragmentos en paralelo."""
+    tarea = asyncio.create_task(calentar())
+    try:
+        await mcp.run_async(
+            transport="http", host="0.0.0.0", port=int(os.getenv("PUERTO", "8000"))
+        )
+    finally:
+        tarea.cancel()
+
+
+@mcp.tool
+async def estado_vuelo(vuelo: str) -> Dict[str, Any]:
+    """Consultar el estado de un vuelo por número en el fragmento que lo contiene.
+
+    Args:
+        vuelo (str): Identificador del vuelo a consultar (p. ej. "PSO-ASU-101").
+
+    Returns:
+        Dict[str, Any]: El resultado de `estado_vuelo` en el fragmento dueño.
+            En caso de error, retorna: {"error": "mensaje"}.
+    """
+    try:
+        origen = origen_de_vuelo(vuelo)
+        if origen is not None:
+            return await _llamar(
+                indice_fragmento(origen, len(_clientes)), "estado_vuelo", {"vuelo": vuelo}
+            )
+        resultados = await _llamar_todos("estado_vuelo", {"vuelo": vuelo})
+        for resultado in resultados:
+            if resultado.get("estado") not in (None, "Desconocido"):
+                return resultado
+        return resultados[0]
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@mcp.tool
+async def opciones_vuelo(origen: str, destino: str, fecha: str) -> Dict[str, Any]:
+    """Listar opciones de vuelo entre origen y destino en una fecha.
+
+    La consulta se envía al fragmento dueño de `origen`.
+
+    Args:
+        origen (str): Código o nombre del aeropuerto de origen.
+        destino (str): Código o nombre del aeropuerto de destino.
+        fecha (str): Fecha en formato ISO "YYYY-MM-DD".
+
+    Returns:
+        Dict[str, Any]: El resultado de `opciones_vuelo` en el fragmento dueño.
+            En caso de error, retorna: {"error": "mensaje"}.
+    """
+    try:
+        return await _llamar(
+            indice_fragmento(origen, len(_clientes)),
+            "opciones_vuelo",
+            {"origen": origen, "destino": destino, "fecha": fecha},
+        )
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@mcp.tool
+async def reservar_vuelo(vuelo: str, numero_asiento: int, id_pasajero: str) -> Dict[str, Any]:
+    """Reservar un asiento para un pasajero en el fragmento dueño del vuelo.
+
+    Args:
+        vuelo (str): Identificador del vuelo donde reservar (p. ej. "PSO-ASU-101").
+        numero_asiento (int): Número de asiento deseado (1..20).
+        id_pasajero (str): Identificador del pasajero.
+
+    Returns:
+        Dict[str, Any]: El resultado de `reservar_vuelo` en el fragmento dueño.
+            En caso de error, retorna: {"error": "mensaje"}.
+    """
+    try:
+        indice = await _fragmento_de_vuelo(vuelo)
+        if indice is None:
+            return {"error": "Vuelo desconocido"}
+        return await _llamar(
+            indice,
+            "reservar_vuelo",
+            {"vuelo": vuelo, "numero_asiento": numero_asiento, "id_pasajero": id_pasajero},
+            idempotente=False,
+        )
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@mcp.tool
+async def eliminar_reserva_vuelo(
+    vuelo: str, numero_asiento: int, id_pasajero: str
+) -> Dict[str, Any]:
+    """Eliminar una reserva existente en el fragmento dueño del vuelo.
+
+    Args:
+        vuelo (str): Identificador del vuelo asociado a la reserva.
+        numero_asiento (int): Número de asiento asignado en la reserva.
+        id_pasajero (str): Identificador del pasajero cuya reserva se eliminará.
+
+    Returns:
+        Dict[str, Any]: El resultado de `eliminar_reserva_vuelo` en el fragmento
+            dueño. En caso de error, retorna: {"error": "mensaje"}.
+    """
+    try:
+        indice = await _fragmento_de_vuelo(vuelo)
+        if indice is None:
+            return {"error": "Reserva no encontrada"}
+        return await _llamar(
+            indice,
+            "eliminar_reserva_vuelo",
+            {"vuelo": vuelo, "numero_asiento": numero_asiento, "id_pasajero": id_pasajero},
+            idempotente=False,
+        )
+    except Exception as e:
+        return {"error": str(e)}
+
+
+@mcp.tool
+async def verificar_reserva_vuelo(vuelo: str, id_pasajero: str) -> Dict[str, Any]:
+    """Verificar si un pasajero tiene una reserva en el fragmento dueño del vuelo.
+
+    Args:
+        vuelo (str): Identificador del vuelo a verificar (p. ej. "PSO-ASU-101").
+        id_pasajero (str): Identificador del pasajero cuya reserva se verificará.
+
+    Returns:
+        Dict[str, Any]: El resultado de `verificar_reserva_vuelo` en el fragmento
+            dueño. En caso de error, retorna: {"error": "mensaje"}.
+    """
+    try:
+        indice = await _fragmento_de_vuelo(vuelo)
+        if indice is None:
+            return {
+                "vuelo": vuelo,
+                "id_pasajero": id_pasajero,
+                "estado": "No se encontró reserva",
+            }
+        return await _llamar(
+            indice,
+            "verificar_reserva_vuelo",
+            {"vuelo": vuelo, "id_pasajero": id_pasajero},
+        )
+    except Exception as e:
+        return {"error": str(e)}
+
+
+async def estadisticas_sql(limite: int = 20, reiniciar: bool = False) -> Dict[str, Any]:
+    """Consultar las estadísticas del perfilador SQL de todos los fragmentos.
+
+    Solo se registra si el enrutador se inicia con ``VCN_PERFILAR=1``; los
+    fragmentos deben tener también el perfilador activo.
+
+    Args:
+        limite (int): Número máximo de sentencias a devolver por fragmento.
+        reiniciar (bool): Si es ``True`` descarta las estadísticas tras leerlas.
+
+    Returns:
+        Dict[str, Any]: {"fragmentos": [resultado de cada fragmento, en orden]}.
+    """
+    # Con `reiniciar` la llamada borra estadísticas: no se repite.
+    resultados = await _llamar_todos(
+        "estadisticas_sql", {"limite": limite, "reiniciar": reiniciar}, not reiniciar
+    )
+    return {"fragmentos": resultados}
+
+
+# Herramienta de administración: no se expone a los clientes si no se perfila.
+if perfilador.ACTIVO:
+    mcp.tool(estadisticas_sql)
+
+
+if __name__ == "__main__":
+    asyncio.run(principal())
@@ -0,0 +1,121 @@
+"""Particionado horizontal (fragmentos) de vuelos por origen.
+
+Cada instancia de `mcp_vcn` puede ser dueña de un fragmento de los vuelos,
+indicado con la variable de entorno ``VCN_FRAGMENTO="i/n"`` (fragmento ``i``
+de ``n``, empezando en 0). Un vuelo pertenece al fragmento que resulta de
+aplicar un hash estable a su aeropuerto de origen, por lo que todas las
+consultas y reservas de una misma ruta caen siempre en la misma instancia.
+
+El número de vuelo lleva el origen como prefijo (``PSO-ASU-101``), lo que
+permite enrutar las herramientas que solo reciben el vuelo sin consultar a
+ningún fragmento.
+"""
+
+import os
+import sqlite3
+import zlib
+from typing import Optional, Tuple
+
+
+def indice_fragmento(origen: str, total: int) -> int:
+    """
+    Calcula a qué fragmento pertenece un origen.
+
+    Se usa CRC32 en lugar de `hash()` porque este último cambia entre
+    procesos y el enrutador y los fragmentos deben coincidir.
+
+    Args:
+        origen (str): Código del aeropuerto de origen.
+        total (int): Número total de fragmentos.
+
+    Returns:
+        int: Índice del fragmento, entre 0 y `total - 1`.
+    """
+    return zlib.crc32(origen.strip().upper().encode("utf-8")) % total
+
+
+def origen_de_vuelo(vuelo: str) -> Optional[str]:
+    """
+    Extrae el origen del número de vuelo (``PSO-ASU-101`` -> ``PSO``).
+
+    Args:
+        vuelo (str): El número del vuelo.
+
+    Returns:
+        str | None: El código de origen, o None si el número no tiene el formato
+        ``ORIGEN-DESTINO-NUMERO``.
+    """
+    partes = vuelo.strip().split("-")
+    if len(partes) < 3 or not partes[0]:
+        return None
+    return partes[0].upper()
+
+
+def fragmento_local() -> Optional[Tuple[int, int]]:
+    """
+    Lee el fragmento de esta instancia desde ``VCN_FRAGMENTO``.
+
+    Returns:
+        tuple[int, int] | None: ``(indice, total)``, o None si la instancia
+        no está fragmentada.
+    """
+    valor = os.getenv("VCN_FRAGMENTO")
+    if not valor:
+        return None
+    indice, total = (int(parte) for parte in valor.split("/"))
+    if not 0 <= indice < total:
+        raise ValueError(f"VCN_FRAGMENTO fuera de rango: {valor}")
+    return indice, total
+
+
+def es_propio(origen: Optional[str], fragmento: Optional[Tuple[int, int]]) -> bool:
+    """
+    Indica si un origen pertenece al fragmento dado.
+
+    Args:
+        origen (str | None): Código del aeropuerto de origen.
+        fragmento (tuple[int, int] | None): ``(indice, total)`` o None.
+
+    Returns:
+        bool: True si no hay fragmentación o si el origen es de este fragmento.
+    """
+    if fragmento is None:
+        return True
+    if not origen:
+        return False
+    indice, total = fragmento
+    return indice_fragmento(origen, total) == indice
+
+
+def podar_fragmento(conn: sqlite3.Connection, indice: int, total: int) -> int:
+    """
+    Elimina los vuelos (y sus reservas) que no pertenecen a este fragmento.
+
+    Se usa tras sembrar una base nueva desde `inicial.sql`, que contiene los
+    datos de todos los orígenes.
+
+    Args:
+        conn (sqlite3.Connection): Conexión a la base del fragmento.
+        indice (int): Índice del fragmento propio.
+        total (int): Número total de fragmentos.
+
+    Returns:
+        int: Número de vuelos eliminados.
+    """
+    conn.create_function("indice_fragmento", 2, indice_fragmento, deterministic=True)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            """DELETE FROM reservas WHERE vuelo IN
+            (SELECT vuelo FROM estado_vuelos WHERE indice_fragmento(origen, ?) != ?)""",
+            (total, indice),
+        )
+        cursor.execute(
+            "DELETE FROM estado_vuelos WHERE indice_fragmento(origen, ?) != ?",
+            (total, indice),
+        )
+        eliminados = cursor.rowcount
+        conn.commit()
+    finally:
+        cursor.close()
+    return eliminados
@@ -0,0 +1,378 @@
+"""Ingesta en streaming de actualizaciones de estado de vuelos.
+
+Lee actualizaciones en formato JSONL o CSV desde un archivo o desde la
+entrada estándar y las aplica sobre `estado_vuelos` como *upserts* por lotes.
+Todo el recorrido se hace con generadores, por lo que la memoria usada es
+constante sin importar el tamaño del flujo: en cada momento solo se mantiene
+en memoria el lote en curso.
+
+Cada registro debe traer al menos ``vuelo`` y ``estado``. Si además trae
+``origen``, ``destino``, ``fecha`` y ``hora`` se inserta o reemplaza el vuelo
+completo; si no, solo se actualiza el estado de un vuelo ya existente. Los
+registros de vuelos ya archivados (ver `particiones.py`) se omiten.
+
+Uso desde la línea de comandos::
+
+    uv run python ingesta.py actualizaciones.jsonl
+    cat actualizaciones.csv | uv run python ingesta.py - --formato csv
+"""
+
+import argparse
+import contextlib
+import csv
+import json
+import os
+import sqlite3
+import sys
+import time
+from itertools import islice
+from typing import (
+    Any, Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+)
+
+from fragmentos import es_propio, fragmento_local, origen_de_vuelo
+from particiones import asegurar_metadatos
+from utilidades import conectar_base_datos
+
+CAMPOS_COMPLETOS = ("vuelo", "estado", "origen", "destino", "fecha", "hora")
+
+# Cada lote, ya reducido a una fila por vuelo en el orden del flujo (ver
+# `separar_lote`), se vuelca primero en tablas temporales y se aplica con una
+# sola sentencia que devuelve, vía RETURNING, solo los vuelos que realmente
+# cambiaron.
+SQL_LOTE_TEMPORAL = """
+CREATE TEMP TABLE IF NOT EXISTS lote_completos (
+    vuelo TEXT PRIMARY KEY, estado TEXT, origen TEXT, destino TEXT, fecha TEXT, hora INTEGER
+);
+CREATE TEMP TABLE IF NOT EXISTS lote_estados (vuelo TEXT PRIMARY KEY, estado TEXT);
+"""
+
+SQL_CARGAR_COMPLETOS = """INSERT OR REPLACE INTO temp.lote_completos
+    (vuelo, estado, origen, destino, fecha, hora) VALUES (?, ?, ?, ?, ?, ?)"""
+
+SQL_CARGAR_ESTADOS = (
+    "INSERT OR REPLACE INTO temp.lote_estados (estado, vuelo) VALUES (?, ?)"
+)
+
+# Los vuelos ya archivados no vuelven a la base principal: quedarían duplicados
+# en las consultas y con dos copias de su estado. Además del índice
+# `vuelos_archivados` (que solo cubre los meses recientes) se descartan los
+# registros completos con fecha dentro de un rango ya archivado.
+SQL_ES_ARCHIVADO = """(l.vuelo IN (SELECT vuelo FROM vuelos_archivados)
+    OR EXISTS (SELECT 1 FROM particiones AS p
+        WHERE p.mes = substr(l.fecha, 1, 7) AND p.hasta >= l.fecha))"""
+
+SQL_CONTAR_ARCHIVADOS = f"""SELECT
+    (SELECT count(*) FROM temp.lote_completos AS l WHERE {SQL_ES_ARCHIVADO})
+    + (SELECT count(*) FROM temp.lote_estados AS l WHERE l.vuelo IN
+        (SELECT vuelo FROM vuelos_archivados))"""
+
+SQL_UPSERT = f"""INSERT INTO estado_vuelos (vuelo, estado, origen, destino, fecha, hora)
+    SELECT vuelo, estado, origen, destino, fecha, hora FROM temp.lote_completos AS l
+    WHERE NOT {SQL_ES_ARCHIVADO}
+    ON CONFLICT(vuelo) DO UPDATE SET
+        estado = excluded.estado,
+        origen = excluded.origen,
+        destino = excluded.destino,
+        fecha = excluded.fecha,
+        hora = excluded.hora
+    WHERE estado_vuelos.estado IS NOT excluded.estado
+        OR estado_vuelos.origen IS NOT excluded.origen
+        OR estado_vuelos.destino IS NOT excluded.destino
+        OR estado_vuelos.fecha IS NOT excluded.fecha
+        OR estado_vuelos.hora IS NOT excluded.hora
+    RETURNING vuelo"""
+
+SQL_ACTUALIZAR_ESTADO = """UPDATE estado_vuelos SET estado = l.estado
+    FROM temp.lote_estados AS l
+    WHERE estado_vuelos.vuelo = l.vuelo AND estado_vuelos.estado IS NOT l.estado
+    RETURNING vuelo"""
+
+SQL_VACIAR_LOTE = ("DELETE FROM temp.lote_completos", "DELETE FROM temp.lote_estados")
+
+def leer_jsonl(flujo: TextIO) -> Iterator[Any]:
+    """
+    Genera el valor JSON de cada línea no vacía de un flujo JSONL.
+
+    Una línea mal formada no interrumpe el flujo: se genera ``None`` en su
+    lugar para que se cuente como rechazada.
+
+    Args:
+        flujo (TextIO): Flujo de texto abierto (archivo o stdin).
+
+    Yields:
+        Any: El valor JSON de cada línea (normalmente un dict), o None si la
+        línea no es JSON válido.
+    """
+    for linea in flujo:
+        linea = linea.strip()
+        if linea:
+            try:
+                yield json.loads(linea)
+            except json.JSONDecodeError:
+                yield None
+
+
+def leer_csv(flujo: TextIO) -> Iterator[Dict[str, Any]]:
+    """
+    Genera un diccionario por cada fila de un flujo CSV con cabecera.
+
+    Args:
+        flujo (TextIO): Flujo de texto abierto (archivo o stdin).
+
+    Yields:
+        dict: La fila con las columnas de la cabecera como claves.
+    """
+    yield from csv.DictReader(flujo)
+
+
+def normalizar_registro(registro: Any) -> Optional[tuple]:
+    """
+    Convierte un registro leído en la tupla de parámetros a aplicar.
+
+    Args:
+        registro (Any): Registro leído del flujo; todo lo que no sea un dict
+            se considera no válido.
+
+    Returns:
+        tuple | None: ``(vuelo, estado, origen, destino, fecha, hora)`` si el
+        registro está completo, ``(estado, vuelo)`` si solo trae el estado, o
+        ``None`` si el registro no es válido.
+    """
+    if not isinstance(registro, dict):
+        return None
+    vuelo = str(registro.get("vuelo") or "").strip()
+    estado = str(registro.get("estado") or "").strip()
+    if not vuelo or not estado:
+        return None
+
+    if all(registro.get(campo) not in (None, "") for campo in CAMPOS_COMPLETOS):
+        try:
+            hora = int(registro["hora"])
+        except (TypeError, ValueError):
+            return None
+        return (
+            vuelo,
+            estado,
+            str(registro["origen"]).strip(),
+            str(registro["destino"]).strip(),
+            str(registro["fecha"]).strip(),
+            hora,
+        )
+    return (estado, vuelo)
+
+
+def lotes(registros: Iterable[Any], tam_lote: int) -> Iterator[List[Any]]:
+    """
+    Agrupa un iterable en listas de como máximo `tam_lote` elementos.
+
+    Args:
+        registros (Iterable): Elementos a agrupar.
+        tam_lote (int): Tamaño máximo de cada lote.
+
+    Yields:
+        list: El siguiente lote de elementos.
+    """
+    iterador = iter(registros)
+    while True:
+        lote = list(islice(iterador, tam_lote))
+        if not lote:
+            return
+        yield lote
+
+
+def separar_lote(lote: List[Any]) -> Tuple[List[tuple], List[tuple], int]:
+    """
+    Normaliza un lote y lo separa según la sentencia que le corresponde a cada vuelo.
+
+    Los registros de un mismo vuelo se combinan en el orden del flujo: un
+    registro completo reemplaza a los anteriores y un registro de solo estado
+    cambia el estado del registro completo previo, si lo hay. Así el
+    resultado no depende de cómo se parta el flujo en lotes:
+
+    >>> separar_lote([
+    ...     {"vuelo": "PSO-ASU-105", "estado": "Cancelado"},
+    ...     {"vuelo": "PSO-ASU-105", "estado": "Activo", "origen": "PSO",
+    ...      "destino": "ASU", "fecha": "2025-10-13", "hora": 900},
+    ... ])
+    ([('PSO-ASU-105', 'Activo', 'PSO', 'ASU', '2025-10-13', 900)], [], 0)
+    >>> separar_lote([  # doctest: +NORMALIZE_WHITESPACE
+    ...     {"vuelo": "PSO-ASU-105", "estado": "Activo", "origen": "PSO",
+    ...      "destino": "ASU", "fecha": "2025-10-13", "hora": 900},
+    ...     {"vuelo": "PSO-ASU-105", "estado": "Cancelado"},
+    ...     {"vuelo": "PSO-ASU-106", "estado": "Programado"},
+    ... ])
+    ([('PSO-ASU-105', 'Cancelado', 'PSO', 'ASU', '2025-10-13', 900)],
+     [('Programado', 'PSO-ASU-106')], 0)
+
+    Args:
+        lote (list): Registros leídos del flujo.
+
+    Returns:
+        tuple: ``(completos, solo_estado, rechazadas)``, con las filas para el
+        upsert, las filas para actualizar solo el estado y el número de
+        registros no válidos.
+    """
+    pendientes: Dict[str, tuple] = {}
+    rechazadas = 0
+    for registro in lote:
+        fila = normalizar_registro(registro)
+        if fila is None:
+            rechazadas += 1
+        elif len(fila) == len(CAMPOS_COMPLETOS):
+            pendientes[fila[0]] = fila
+        else:
+            estado, vuelo = fila
+            previa = pendientes.get(vuelo)
+            if previa is not None and len(previa) == len(CAMPOS_COMPLETOS):
+                pendientes[vuelo] = (vuelo, estado, *previa[2:])
+            else:
+                pendientes[vuelo] = fila
+    completos = [f for f in pendientes.values() if len(f) == len(CAMPOS_COMPLETOS)]
+    solo_estado = [f for f in pendientes.values() if len(f) != len(CAMPOS_COMPLETOS)]
+    return completos, solo_estado, rechazadas
+
+
+def aplicar_lote(
+    completos: List[tuple], solo_estado: List[tuple], conn: sqlite3.Connection
+) -> Tuple[set, int]:
+    """
+    Aplica un lote ya separado en una única transacción.
+
+    Args:
+        completos (list[tuple]): Filas para el upsert del vuelo completo.
+        solo_estado (list[tuple]): Filas ``(estado, vuelo)`` para actualizar solo el estado.
+        conn (sqlite3.Connection): Conexión a la base de datos.
+
+    Returns:
+        tuple: ``(modificados, archivadas)``, con los vuelos cuyos valores
+        cambiaron y el número de filas omitidas por ser de vuelos archivados.
+    """
+    modificados = set()
+    cursor = conn.cursor()
+    try:
+        cursor.executemany(SQL_CARGAR_COMPLETOS, completos)
+        cursor.executemany(SQL_CARGAR_ESTADOS, solo_estado)
+        cursor.execute(SQL_CONTAR_ARCHIVADOS)
+        archivadas = cursor.fetchone()[0]
+        if completos:
+            cursor.execute(SQL_UPSERT)
+            modificados.update(fila[0] for fila in cursor.fetchall())
+        if solo_estado:
+            cursor.execute(SQL_ACTUALIZAR_ESTADO)
+            modificados.update(fila[0] for fila in cursor.fetchall())
+        for sql in SQL_VACIAR_LOTE:
+            cursor.execute(sql)
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return modificados, archivadas
+
+
+def ingerir_actualizaciones(
+    registros: Iterable[Any],
+    conn: sqlite3.Connection,
+    tam_lote: int = 5000,
+    al_confirmar: Optional[Callable[[set], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Aplica un flujo de actualizaciones de estado como upserts por lotes.
+
+    Cada lote se aplica dentro de una única transacción. Tras confirmar un
+    lote se llama a `al_confirmar` con el conjunto exacto de vuelos
+    modificados (los que ya tenían esos mismos valores no se incluyen), de
+    forma que cualquier caché en memoria del estado de los vuelos pueda
+    invalidar solo esas entradas. El aviso solo llega a cachés del mismo
+    proceso que ejecuta la ingesta.
+
+    Args:
+        registros (Iterable): Registros con las claves de `estado_vuelos`.
+        conn (sqlite3.Connection): Conexión a la base de datos.
+        tam_lote (int): Número de registros por transacción.
+        al_confirmar (Callable[[set], None] | None): Función a la que se
+            notifican los vuelos modificados tras cada lote confirmado.
+
+    Returns:
+        dict: Resumen con filas leídas, vuelos modificados (``aplicadas``),
+        filas rechazadas, filas de vuelos archivados omitidas, lotes,
+        segundos transcurridos y filas por segundo.
+    """
+    inicio = time.perf_counter()
+    resumen = dict.fromkeys(
+        ("leidas", "aplicadas", "rechazadas", "archivadas", "lotes"), 0
+    )
+    asegurar_metadatos(conn)
+    conn.executescript(SQL_LOTE_TEMPORAL)
+
+    for lote in lotes(registros, tam_lote):
+        completos, solo_estado, invalidas = separar_lote(lote)
+        modificados, omitidas = aplicar_lote(completos, solo_estado, conn)
+        resumen["leidas"] += len(lote)
+        resumen["aplicadas"] += len(modificados)
+        resumen["rechazadas"] += invalidas
+        resumen["archivadas"] += omitidas
+        resumen["lotes"] += 1
+
+        if al_confirmar is not None:
+            al_confirmar(modificados)
+
+    segundos = time.perf_counter() - inicio
+    resumen["segundos"] = round(segundos, 3)
+    resumen["filas_por_segundo"] = (
+        round(resumen["leidas"] / segundos, 1) if segundos > 0 else None
+    )
+    return resumen
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Punto de entrada de la línea de comandos."""
+    parser = argparse.ArgumentParser(
+        description="Ingesta en streaming de actualizaciones de estado de vuelos."
+    )
+    parser.add_argument(
+        "origen", help="Archivo JSONL/CSV con las actualizaciones, o '-' para stdin."
+    )
+    parser.add_argument(
+        "--formato",
+        choices=("jsonl", "csv"),
+        help="Formato de entrada (por defecto se deduce de la extensión, o jsonl).",
+    )
+    parser.add_argument("--tam-lote", type=int, default=5000)
+    parser.add_argument("--db", default=os.getenv("VCN_DB", "vuelos.db"))
+    args = parser.parse_args(argv)
+
+    formato = args.formato or ("csv" if args.origen.endswith(".csv") else "jsonl")
+    lector = leer_csv if formato == "csv" else leer_jsonl
+
+    if args.origen == "-":
+        contexto = contextlib.nullcontext(sys.stdin)
+    else:
+        contexto = open(args.origen, "r", encoding="utf-8", newline="")
+
+    with contexto as flujo:
+        registros = lector(flujo)
+        fragmento = fragmento_local()
+        if fragmento is not None:
+            # Un fragmento solo aplica las actualizaciones de sus propios orígenes;
+            # lo que no es un objeto pasa para contarse como rechazado.
+            registros = (
+                r
+                for r in registros
+                if not isinstance(r, dict)
+                or es_propio(
+                    r.get("origen") or origen_de_vuelo(str(r.get("vuelo") or "")),
+                    fragmento,
+                )
+            )
+        conn = conectar_base_datos(args.db)
+        try:
+            resumen = ingerir_actualizaciones(registros, conn, args.tam_lote)
+        finally:
+            conn.close()
+    print(json.dumps(resumen, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,19 +3,31 @@
 Este módulo expone herramientas MCP (decoradas con `@mcp.tool`) para:
 - consultar el estado de un vuelo,
 - listar opciones de vuelo por origen/destino/fecha,
-- reservar un asiento y
-- eliminar una reserva.
-
-Las funciones abren y cierran la conexión a la base de datos local usando
-`conectar_base_datos` y devuelven diccionarios con los resultados o con la
-clave `error` en caso de excepción.
+- reservar un asiento,
+- eliminar una reserva y
+- consultar las estadísticas del perfilador SQL (herramienta de administración,
+  registrada solo si el perfilador está activo con ``VCN_PERFILAR=1``).
+
+Las herramientas comparten la conexión a la base de datos local que
+devuelve `obtener_conexion` y devuelven diccionarios con los resultados o con
+la clave `error` en caso de excepción.
+
+Al ejecutarse como script, el servicio abre y calienta la base de datos
+(índices, sentencias preparadas y caché de páginas) antes de abrir el puerto
+HTTP; el endpoint ``GET /ready`` informa de los tiempos de arranque.
 """
 
-from typing import Dict, Any
+import os
+import time
+from typing import Dict, Any, Callable
 from fastmcp import FastMCP
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+import perfilador
 from utilidades import (
+    calentar_base_datos,
     consulta_estado_vuelo,
-    conectar_base_datos,
+    obtener_conexion,
     consultar_opciones_vuelo,
     reservar_asiento,
     eliminar_reserva,
@@ -23,8 +35,51 @@ from utilidades import (
 )
 
 
+INICIO_PROCESO = time.perf_counter()
+
 mcp = FastMCP(name="vuela-con-nosotros-servicio")
 
+# Estado del arranque expuesto en /ready.
+arranque: Dict[str, Any] = {"listo": False, "fases_ms": {}}
+
+
+def _ejecutar(funcion: Callable[..., Dict[str, Any]], *args: Any) -> Dict[str, Any]:
+    """Ejecuta una función de `utilidades` con la conexión compartida.
+
+    Si la función falla con una transacción abierta se deshace, para que la
+    conexión compartida no quede bloqueando escrituras.
+    """
+    conn = None
+    try:
+        conn = obtener_conexion()
+        return funcion(*args, conn)
+    except Exception as e:
+        if conn is not None and conn.in_transaction:
+            conn.rollback()
+        return {"error": str(e)}
+
+
+def calentar() -> None:
+    """Abre la base de datos y la deja lista antes de aceptar peticiones."""
+    inicio = time.perf_counter()
+    conn = obtener_conexion()
+    arranque["fases_ms"]["conexion"] = round((time.perf_counter() - inicio) * 1000, 3)
+    arranque["fases_ms"].update(calentar_base_datos(conn))
+    arranque["arranque_ms"] = round((time.perf_counter() - INICIO_PROCESO) * 1000, 3)
+    arranque["listo"] = True
+    print(f"Servicio MCP listo en {arranque['arranque_ms']} ms: {arranque['fases_ms']}")
+
+
+@mcp.custom_route("/ready", methods=["GET"])
+async def ready(_: Request) -> JSONResponse:
+    """Devuelve 200 con los tiempos de arranque si el calentamiento terminó.
+
+    Como script, el puerto solo se abre después de `calentar()`, así que
+    mientras se calienta la conexión se rechaza en lugar de recibir 503. El
+    503 solo aparece si el servidor se arrancó sin llamar a `calentar()`.
+    """
+    return JSONResponse(arranque, status_code=200 if arranque["listo"] else 503)
+
 
 @mcp.tool
 def estado_vuelo(vuelo: str) -> Dict[str, Any]:
@@ -51,15 +106,7 @@ def estado_vuelo(vuelo: str) -> Dict[str, Any]:
 
         En caso de error, retorna: {"error": "mensaje"}.
     """
-    conn = None
-    try:
-        conn = conectar_base_datos()
-        return consulta_estado_vuelo(vuelo, conn)
-    except Exception as e:
-        return {"error": str(e)}
-    finally:
-        if conn:
-            conn.close()
+    return _ejecutar(consulta_estado_vuelo, vuelo)
 
 
 @mcp.tool
@@ -95,15 +142,7 @@ def opciones_vuelo(origen: str, destino: str, fecha: str) -> Dict[str, Any]:
 
         En caso de error, retorna: {"error": "mensaje"}.
     """
-    conn = None
-    try:
-        conn = conectar_base_datos()
-        return consultar_opciones_vuelo(origen, destino, fecha, conn)
-    except Exception as e:
-        return {"error": str(e)}
-    finally:
-        if conn:
-            conn.close()
+    return _ejecutar(consultar_opciones_vuelo, origen, destino, fecha)
 
 
 @mcp.tool
@@ -111,8 +150,8 @@ def reservar_vuelo(vuelo: str, numero_asiento: int, id_pasajero: str) -> Dict[st
     """Reservar un asiento para un pasajero en un vuelo.
 
     Llama a la función `reservar_asiento` del módulo `utilidades`, encargada
-    de realizar la inserción en la tabla `reservas`. La función maneja la
-    apertura y cierre de la conexión y captura excepciones, devolviendo
+    de realizar la inserción en la tabla `reservas`. La función usa la
+    conexión compartida y captura excepciones, devolviendo
     un diccionario con el resultado o con la clave ``error`` en caso de
     fallo.
 
@@ -125,15 +164,7 @@ def reservar_vuelo(vuelo: str, numero_asiento: int, id_pasajero: str) -> Dict[st
         Dict[str, Any]: Resultado de la operación según `reservar_asiento`.
             En caso de error, retorna: {"error": "mensaje"}.
     """
-    conn = None
-    try:
-        conn = conectar_base_datos()
-        return reservar_asiento(vuelo, numero_asiento, id_pasajero, conn)
-    except Exception as e:
-        return {"error": str(e)}
-    finally:
-        if conn:
-            conn.close()
+    return _ejecutar(reservar_asiento, vuelo, numero_asiento, id_pasajero)
 
 
 @mcp.tool
@@ -155,15 +186,7 @@ def eliminar_reserva_vuelo(
         Dict[str, Any]: Resultado de la eliminación. En caso de error,
             retorna: {"error": "mensaje"}.
     """
-    conn = None
-    try:
-        conn = conectar_base_datos()
-        return eliminar_reserva(vuelo, numero_asiento, id_pasajero, conn)
-    except Exception as e:
-        return {"error": str(e)}
-    finally:
-        if conn:
-            conn.close()
+    return _ejecutar(eliminar_reserva, vuelo, numero_asiento, id_pasajero)
 
 @mcp.tool
 def verificar_reserva_vuelo(vuelo: str, id_pasajero: str) -> Dict[str, Any]:
@@ -182,17 +205,63 @@ def verificar_reserva_vuelo(vuelo: str, id_pasajero: str) -> Dict[str, Any]:
         Dict[str, Any]: Resultado de la verificación. En caso de error,
             retorna: {"error": "mensaje"}.
     """
-    conn = None
+    return _ejecutar(verificar_reserva, vuelo, id_pasajero)
+
+def estadisticas_sql(limite: int = 20, reiniciar: bool = False) -> Dict[str, Any]:
+    """Consultar las estadísticas del perfilador de sentencias SQL (administración).
+
+    Devuelve, por cada sentencia normalizada, el número de llamadas, el tiempo
+    acumulado, máximo y medio, las filas devueltas y los pasos de la VM de
+    SQLite, ordenadas por tiempo acumulado. Solo se registra como herramienta
+    si el servicio se inició con ``VCN_PERFILAR=1``.
+
+    Args:
+        limite (int): Número máximo de sentencias a devolver.
+        reiniciar (bool): Si es ``True`` descarta las estadísticas tras leerlas.
+
+    Returns:
+        Dict[str, Any]: Diccionario con la estructura:
+            {
+                "activo": True,
+                "umbral_lento_ms": 50.0,
+                "sentencias": [
+                    {
+                        "sql": "SELECT ... WHERE vuelo = ?",
+                        "llamadas": 12,
+                        "tiempo_total_ms": 3.1,
+                        "tiempo_max_ms": 0.9,
+                        "tiempo_medio_ms": 0.26,
+                        "filas": 12,
+                        "pasos_vm": 400
+                    },
+                    ...
+                ]
+            }
+
+        En caso de error, retorna: {"error": "mensaje"}.
+    """
     try:
-        conn = conectar_base_datos()
-        return verificar_reserva(vuelo, id_pasajero, conn)
+        sentencias = perfilador.ESTADISTICAS.resumen(limite)
+        if reiniciar:
+            perfilador.ESTADISTICAS.reiniciar()
+        return {
+            "activo": perfilador.ACTIVO,
+            "umbral_lento_ms": perfilador.UMBRAL_LENTO_MS,
+            "sentencias": sentencias,
+        }
     except Exception as e:
         return {"error": str(e)}
-    finally:
-        if conn:
-            conn.close()
+
+
+# Herramienta de administración: no se expone a los clientes si no se perfila.
+if perfilador.ACTIVO:
+    mcp.tool(estadisticas_sql)
 
 if __name__ == "__main__":
+    # Se calienta antes de abrir el puerto: las herramientas comparten la
+    # conexión en el hilo del bucle de eventos, así que no puede calentarse
+    # en segundo plano mientras se atienden peticiones.
+    calentar()
     # Bind to 0.0.0.0 so the MCP server is reachable from other containers
     # in the docker-compose network (using the service name `mcp_vcn`).
-    mcp.run(transport="http", host="0.0.0.0", port=8000)
+    mcp.run(transport="http", host="0.0.0.0", port=int(os.getenv("PUERTO", "8000")))
@@ -0,0 +1,444 @@
+"""Particionado por fecha de `estado_vuelos` y `reservas`.
+
+La base principal (`vuelos.db`) mantiene solo los vuelos futuros y recientes.
+Los vuelos ya partidos se trasladan, junto con sus reservas, a una base de
+archivo por mes (`vuelos_archivo/vuelos_YYYY_MM.db`, junto a la base
+principal) que se adjunta con ``ATTACH`` únicamente cuando una consulta la
+necesita.
+
+La base principal guarda dos tablas de metadatos:
+
+- `particiones`: una fila por mes archivado con la ruta de su base, la
+  fecha más reciente archivada (`hasta`) y si sus vuelos siguen en el índice
+  `vuelos_archivados` (`indexado`).
+- `vuelos_archivados`: índice vuelo -> mes, para encontrar en qué archivo
+  está un vuelo sin abrir todos los archivos.
+
+Para que la base principal no crezca con todo el histórico, el índice solo
+guarda los vuelos de los últimos meses archivados (``--meses-indice``). Los
+vuelos de meses más antiguos se buscan abriendo, uno a uno, los archivos de
+los meses no indexados (`indexado = 0`): más lento, pero solo ocurre al
+consultar un vuelo viejo o inexistente.
+
+Uso desde la línea de comandos::
+
+    uv run python particiones.py --dias-retencion 2 --meses-indice 3
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+from contextlib import closing, contextmanager
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+
+# Si no se define, cada base principal usa su propio directorio de archivo
+# junto a ella (`vuelos.db` -> `vuelos_archivo/`).
+DIR_ARCHIVO = os.getenv("VCN_DIR_ARCHIVO")
+
+ESQUEMA_ARCHIVO = "archivo"
+
+SQL_MES_DE_VUELO = "SELECT mes FROM vuelos_archivados WHERE vuelo = ?"
+SQL_MES_DE_FECHA = "SELECT mes FROM particiones WHERE mes = ? AND hasta >= ?"
+SQL_VUELO_EN_PRINCIPAL = "SELECT 1 FROM main.estado_vuelos WHERE vuelo = ?"
+SQL_MESES_NO_INDEXADOS = (
+    "SELECT mes, ruta FROM particiones WHERE indexado = 0 ORDER BY mes DESC"
+)
+
+SQL_METADATOS = """
+CREATE TABLE IF NOT EXISTS particiones (
+    mes TEXT PRIMARY KEY,   -- formato YYYY-MM
+    ruta TEXT NOT NULL,
+    hasta TEXT NOT NULL,    -- fecha más reciente archivada, YYYY-MM-DD
+    indexado INTEGER NOT NULL DEFAULT 1  -- 0 si sus vuelos salieron de vuelos_archivados
+);
+CREATE TABLE IF NOT EXISTS vuelos_archivados (
+    vuelo TEXT PRIMARY KEY,
+    mes TEXT NOT NULL
+);
+"""
+
+SQL_ESQUEMA_ARCHIVO = """
+CREATE TABLE IF NOT EXISTS {esquema}.estado_vuelos (
+    vuelo TEXT PRIMARY KEY,
+    estado TEXT NOT NULL,
+    origen TEXT NOT NULL,
+    destino TEXT NOT NULL,
+    fecha TEXT NOT NULL,
+    hora INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS {esquema}.reservas (
+    id INTEGER PRIMARY KEY,
+    vuelo TEXT NOT NULL,
+    id_pasajero TEXT NOT NULL,
+    numero_asiento INTEGER NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS {esquema}.idx_reservas_asiento
+    ON reservas(vuelo, numero_asiento);
+CREATE INDEX IF NOT EXISTS {esquema}.idx_estado_vuelos_ruta
+    ON estado_vuelos(origen, destino, fecha);
+"""
+
+
+def asegurar_metadatos(conn: sqlite3.Connection) -> None:
+    """
+    Crea las tablas de metadatos de particiones en la base principal si no existen.
+
+    Args:
+        conn (sqlite3.Connection): Conexión a la base principal.
+    """
+    conn.executescript(SQL_METADATOS)
+    columnas = {fila[1] for fila in conn.execute("PRAGMA table_info(particiones)")}
+    if "indexado" not in columnas:
+        # Bases creadas antes de existir la poda del índice.
+        conn.executescript(
+            "ALTER TABLE particiones ADD COLUMN indexado INTEGER NOT NULL DEFAULT 1;"
+        )
+
+
+def directorio_archivo(conn: sqlite3.Connection) -> str:
+    """
+    Devuelve el directorio donde se guardan los archivos mensuales de una base.
+
+    Args:
+        conn (sqlite3.Connection): Conexión a la base principal.
+
+    Returns:
+        str: `VCN_DIR_ARCHIVO` si está definido; si no, un directorio junto a
+        la base principal con su mismo nombre y el sufijo ``_archivo``.
+    """
+    if DIR_ARCHIVO:
+        return DIR_ARCHIVO
+    ruta_db = next(
+        (fila[2] for fila in conn.execute("PRAGMA database_list") if fila[1] == "main"),
+        "",
+    )
+    if not ruta_db:
+        # Base en memoria: no hay archivo junto al que ubicarse.
+        return "archivo"
+    return os.path.splitext(ruta_db)[0] + "_archivo"
+
+
+def ruta_archivo(mes: str, conn: sqlite3.Connection) -> str:
+    """
+    Devuelve la ruta en la que se crea la base de archivo de un mes.
+
+    Args:
+        mes (str): Mes en formato 'YYYY-MM'.
+        conn (sqlite3.Connection): Conexión a la base principal.
+
+    Returns:
+        str: Ruta del archivo SQLite del mes.
+    """
+    return os.path.join(directorio_archivo(conn), f"vuelos_{mes.replace('-', '_')}.db")
+
+
+def ruta_registrada(mes: str, conn: sqlite3.Connection) -> Optional[str]:
+    """
+    Devuelve la ruta con la que se registró el archivo de un mes en `particiones`.
+
+    Args:
+        mes (str): Mes en formato 'YYYY-MM'.
+        conn (sqlite3.Connection): Conexión a la base principal.
+
+    Returns:
+        str | None: La ruta guardada, o None si el mes no se archivó.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT ruta FROM particiones WHERE mes = ?", (mes,))
+        resultado = cursor.fetchone()
+    finally:
+        cursor.close()
+    return resultado[0] if resultado else None
+
+
+def mes_de_vuelo_archivado(vuelo: str, conn: sqlite3.Connection) -> Optional[str]:
+    """
+    Indica en qué mes de archivo está un vuelo.
+
+    Args:
+        vuelo (str): El número del vuelo.
+        conn (sqlite3.Connection): Conexión a la base principal.
+
+    Se busca primero en el índice `vuelos_archivados` y, si no está, en los
+    archivos de los meses ya podados del índice, del más reciente al más
+    antiguo. Un vuelo presente en la base principal no está archivado, así que
+    en ese caso no se abre ningún archivo.
+
+    Args:
+        vuelo (str): El número del vuelo.
+        conn (sqlite3.Connection): Conexión a la base principal.
+
+    Returns:
+        str | None: El mes 'YYYY-MM' si el vuelo está archivado, o None.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute(SQL_MES_DE_VUELO, (vuelo,))
+        resultado = cursor.fetchone()
+        if resultado:
+            return resultado[0]
+        cursor.execute(SQL_VUELO_EN_PRINCIPAL, (vuelo,))
+        if cursor.fetchone():
+            return None
+        cursor.execute(SQL_MESES_NO_INDEXADOS)
+        no_indexados = cursor.fetchall()
+    finally:
+        cursor.close()
+
+    for mes, ruta in no_indexados:
+        if not os.path.isfile(ruta):
+            continue
+        with _adjuntar(ruta, conn) as esquema:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    f"SELECT 1 FROM {esquema}.estado_vuelos WHERE vuelo = ?", (vuelo,)
+                )
+                encontrado = cursor.fetchone() is not None
+            finally:
+                cursor.close()
+        if encontrado:
+            return mes
+    return None
+
+
+def mes_de_fecha_archivada(fecha: str, conn: sqlite3.Connection) -> Optional[str]:
+    """
+    Indica si una fecha tiene vuelos archivados y en qué mes.
+
+    Args:
+        fecha (str): Fecha en formato 'YYYY-MM-DD'.
+        conn (sqlite3.Connection): Conexión a la base principal.
+
+    Returns:
+        str | None: El mes 'YYYY-MM' si la fecha cae dentro de lo archivado,
+        o None si todos sus vuelos siguen en la base principal.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute(SQL_MES_DE_FECHA, (fecha[:7], fecha))
+        resultado = cursor.fetchone()
+    finally:
+        cursor.close()
+    return resultado[0] if resultado else None
+
+
+@contextmanager
+def _adjuntar(ruta: str, conn: sqlite3.Connection) -> Iterator[str]:
+    """Adjunta la base de `ruta` como `ESQUEMA_ARCHIVO` durante el bloque `with`."""
+    conn.execute(f"ATTACH DATABASE ? AS {ESQUEMA_ARCHIVO}", (ruta,))
+    try:
+        yield ESQUEMA_ARCHIVO
+    finally:
+        conn.execute(f"DETACH DATABASE {ESQUEMA_ARCHIVO}")
+
+
+@contextmanager
+def archivo_adjunto(mes: str, conn: sqlite3.Connection) -> Iterator[str]:
+    """
+    Adjunta la base de archivo de un mes mientras dura el bloque `with`.
+
+    Se usa la ruta registrada en `particiones` al archivar el mes. Si el
+    archivo ya no existe se lanza un error en lugar de adjuntarlo, ya que
+    ``ATTACH`` crearía una base vacía en su lugar.
+
+    Args:
+        mes (str): Mes en formato 'YYYY-MM'.
+        conn (sqlite3.Connection): Conexión a la base principal.
+
+    Yields:
+        str: Nombre del esquema con el que se adjuntó la base.
+
+    Raises:
+        FileNotFoundError: Si el mes no está registrado o su archivo no existe.
+    """
+    ruta = ruta_registrada(mes, conn)
+    if ruta is None or not os.path.isfile(ruta):
+        raise FileNotFoundError(
+            f"No se encuentra el archivo del mes {mes}: {ruta or 'sin registrar'}"
+        )
+    with _adjuntar(ruta, conn) as esquema:
+        yield esquema
+
+
+@contextmanager
+def esquema_de_vuelo(vuelo: str, conn: sqlite3.Connection) -> Iterator[str]:
+    """
+    Resuelve en qué base está un vuelo y la deja disponible durante el bloque `with`.
+
+    Args:
+        vuelo (str): El número del vuelo.
+        conn (sqlite3.Connection): Conexión a la base principal.
+
+    Yields:
+        str: "main" si el vuelo está en la base principal, o el esquema con el
+        que se adjuntó su archivo mensual.
+    """
+    mes = mes_de_vuelo_archivado(vuelo, conn)
+    if mes is None:
+        yield "main"
+    else:
+        with archivo_adjunto(mes, conn) as esquema:
+            yield esquema
+
+
+def archivar_vuelos(fecha_corte: str, conn: sqlite3.Connection) -> Dict[str, Any]:
+    """
+    Traslada los vuelos anteriores a `fecha_corte` y sus reservas a los archivos mensuales.
+
+    Cada mes se traslada en una única transacción que abarca la base
+    principal y la de archivo, de modo que un vuelo nunca queda a medio mover.
+
+    Args:
+        fecha_corte (str): Se archivan los vuelos con fecha estrictamente anterior,
+            en formato 'YYYY-MM-DD'.
+        conn (sqlite3.Connection): Conexión a la base principal.
+
+    Returns:
+        dict: Vuelos y reservas archivados por mes.
+    """
+    asegurar_metadatos(conn)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT DISTINCT substr(fecha, 1, 7) FROM estado_vuelos WHERE fecha < ?",
+            (fecha_corte,),
+        )
+        meses: List[str] = [fila[0] for fila in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+    os.makedirs(directorio_archivo(conn), exist_ok=True)
+    resumen = {}
+    for mes in meses:
+        # Los vuelos a mover: los del mes anteriores a la fecha de corte.
+        filtro = "fecha < ? AND substr(fecha, 1, 7) = ?"
+        params = (fecha_corte, mes)
+        # Un mes ya archivado sigue usando su archivo, aunque cambie el directorio.
+        ruta = ruta_registrada(mes, conn) or ruta_archivo(mes, conn)
+        with _adjuntar(ruta, conn) as esquema:
+            conn.executescript(SQL_ESQUEMA_ARCHIVO.format(esquema=esquema))
+            cursor = conn.cursor()
+            try:
+                cursor.execute("BEGIN")
+                cursor.execute(
+                    f"""INSERT OR REPLACE INTO {esquema}.estado_vuelos
+                    SELECT vuelo, estado, origen, destino, fecha, hora
+                    FROM main.estado_vuelos WHERE {filtro}""",
+                    params,
+                )
+                vuelos = cursor.rowcount
+                # El archivo asigna sus propios id: los de la base principal
+                # no son únicos entre bases que comparten directorio de archivo.
+                cursor.execute(
+                    f"""INSERT OR REPLACE INTO {esquema}.reservas
+                    (vuelo, id_pasajero, numero_asiento)
+                    SELECT vuelo, id_pasajero, numero_asiento
+                    FROM main.reservas WHERE vuelo IN
+                    (SELECT vuelo FROM main.estado_vuelos WHERE {filtro})""",
+                    params,
+                )
+                reservas = cursor.rowcount
+                cursor.execute(
+                    f"""INSERT OR REPLACE INTO main.vuelos_archivados (vuelo, mes)
+                    SELECT vuelo, ? FROM main.estado_vuelos WHERE {filtro}""",
+                    (mes, *params),
+                )
+                cursor.execute(
+                    f"""DELETE FROM main.reservas WHERE vuelo IN
+                    (SELECT vuelo FROM main.estado_vuelos WHERE {filtro})""",
+                    params,
+                )
+                cursor.execute(
+                    f"DELETE FROM main.estado_vuelos WHERE {filtro}", params
+                )
+                cursor.execute(
+                    f"""INSERT INTO main.particiones (mes, ruta, hasta)
+                    SELECT ?, ?, max(fecha) FROM {esquema}.estado_vuelos WHERE true
+                    ON CONFLICT(mes) DO UPDATE SET hasta = excluded.hasta""",
+                    (mes, ruta),
+                )
+                cursor.execute("COMMIT")
+            except sqlite3.Error:
+                cursor.execute("ROLLBACK")
+                raise
+            finally:
+                cursor.close()
+        resumen[mes] = {"vuelos": vuelos, "reservas": reservas}
+
+    return {"fecha_corte": fecha_corte, "meses": resumen}
+
+
+def podar_indice(meses_indice: int, conn: sqlite3.Connection) -> int:
+    """
+    Saca del índice `vuelos_archivados` los vuelos de los meses archivados más antiguos.
+
+    Se conservan los `meses_indice` meses archivados más recientes; el resto
+    se marca con `indexado = 0` en `particiones` y sus vuelos se buscan
+    directamente en sus archivos (ver `mes_de_vuelo_archivado`).
+
+    Args:
+        meses_indice (int): Número de meses archivados que se mantienen indexados.
+        conn (sqlite3.Connection): Conexión a la base principal, en modo autocommit.
+
+    Returns:
+        int: Número de vuelos eliminados del índice.
+    """
+    asegurar_metadatos(conn)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN")
+        cursor.execute(
+            """UPDATE particiones SET indexado = 0
+            WHERE indexado = 1 AND mes NOT IN
+            (SELECT mes FROM particiones ORDER BY mes DESC LIMIT ?)""",
+            (meses_indice,),
+        )
+        cursor.execute(
+            """DELETE FROM vuelos_archivados WHERE mes IN
+            (SELECT mes FROM particiones WHERE indexado = 0)"""
+        )
+        eliminados = cursor.rowcount
+        cursor.execute("COMMIT")
+    except sqlite3.Error:
+        cursor.execute("ROLLBACK")
+        raise
+    finally:
+        cursor.close()
+    return eliminados
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Punto de entrada de la línea de comandos."""
+    parser = argparse.ArgumentParser(
+        description="Archiva los vuelos ya partidos y sus reservas en bases mensuales."
+    )
+    parser.add_argument(
+        "--dias-retencion",
+        type=int,
+        default=1,
+        help="Días pasados que se conservan en la base principal.",
+    )
+    parser.add_argument(
+        "--meses-indice",
+        type=int,
+        default=3,
+        help="Meses archivados cuyos vuelos se mantienen en `vuelos_archivados`.",
+    )
+    parser.add_argument("--db", default=os.getenv("VCN_DB", "vuelos.db"))
+    args = parser.parse_args(argv)
+
+    fecha_corte = (date.today() - timedelta(days=args.dias_retencion)).isoformat()
+    # Se usa modo autocommit para controlar la transacción explícitamente:
+    # ATTACH/DETACH no pueden ejecutarse dentro de una transacción.
+    with closing(sqlite3.connect(args.db, isolation_level=None)) as conn:
+        resumen = archivar_vuelos(fecha_corte, conn)
+        resumen["podados_del_indice"] = podar_indice(args.meses_indice, conn)
+    print(json.dumps(resumen, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
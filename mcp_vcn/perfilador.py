@@ -0,0 +1,303 @@
+"""Perfilador opcional de sentencias SQLite.
+
+Se activa con la variable de entorno ``VCN_PERFILAR=1``. En ese caso
+`conectar_base_datos` crea las conexiones con `ConexionPerfilada`, que
+registra por cada sentencia normalizada (literales sustituidos por ``?``):
+
+- número de llamadas,
+- tiempo acumulado y máximo (ejecución más lectura de filas),
+- filas devueltas (o afectadas, en sentencias de escritura),
+- pasos de la máquina virtual de SQLite, contados con el *progress handler*.
+
+Las sentencias que no pasan por un cursor (por ejemplo las de
+``executescript`` o el ``BEGIN`` implícito) se cuentan mediante el *trace
+callback*, sin tiempo asociado.
+
+Cuando una llamada supera ``VCN_UMBRAL_LENTO_MS`` se registra en el logger
+``vcn.sql`` junto con su ``EXPLAIN QUERY PLAN``. Si se define
+``VCN_PERFIL_ARCHIVO``, las estadísticas se vuelcan en JSON a ese archivo
+al terminar el proceso.
+"""
+
+import atexit
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import weakref
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+ACTIVO = os.getenv("VCN_PERFILAR", "0") == "1"
+UMBRAL_LENTO_MS = float(os.getenv("VCN_UMBRAL_LENTO_MS", "50"))
+ARCHIVO_VOLCADO = os.getenv("VCN_PERFIL_ARCHIVO")
+
+# Cada cuántas instrucciones de la VM se invoca el progress handler.
+PASOS_POR_AVISO = 100
+
+logger = logging.getLogger("vcn.sql")
+
+_RE_CADENA = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMERO = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_ESPACIOS = re.compile(r"\s+")
+_SENTENCIAS_CON_PLAN = ("SELECT", "INSERT", "UPDATE", "DELETE", "REPLACE", "WITH")
+
+
+def normalizar_sql(sql: str) -> str:
+    """
+    Normaliza una sentencia para agrupar las que solo difieren en literales.
+
+    Args:
+        sql (str): Texto de la sentencia.
+
+    Returns:
+        str: La sentencia con literales reemplazados por ``?`` y espacios colapsados.
+    """
+    sql = _RE_CADENA.sub("?", sql)
+    sql = _RE_NUMERO.sub("?", sql)
+    return _RE_ESPACIOS.sub(" ", sql).strip()
+
+
+class EstadisticasSQL:
+    """Acumulador de estadísticas por sentencia, compartido entre conexiones."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._datos: Dict[str, Dict[str, Any]] = {}
+
+    def registrar(
+        self, sql: str, segundos: Optional[float], filas: int = 0, pasos: int = 0
+    ) -> None:
+        """Suma una llamada a la sentencia normalizada `sql`."""
+        clave = normalizar_sql(sql)
+        with self._lock:
+            datos = self._datos.get(clave)
+            if datos is None:
+                datos = self._datos[clave] = {
+                    "sql": clave,
+                    "llamadas": 0,
+                    "tiempo_total_ms": 0.0,
+                    "tiempo_max_ms": 0.0,
+                    "filas": 0,
+                    "pasos_vm": 0,
+                }
+            datos["llamadas"] += 1
+            datos["filas"] += filas
+            datos["pasos_vm"] += pasos
+            if segundos is not None:
+                ms = segundos * 1000
+                datos["tiempo_total_ms"] += ms
+                datos["tiempo_max_ms"] = max(datos["tiempo_max_ms"], ms)
+
+    def resumen(self, limite: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Devuelve las sentencias ordenadas por tiempo acumulado descendente."""
+        with self._lock:
+            filas = [dict(datos) for datos in self._datos.values()]
+        filas.sort(key=lambda d: d["tiempo_total_ms"], reverse=True)
+        for datos in filas:
+            datos["tiempo_total_ms"] = round(datos["tiempo_total_ms"], 3)
+            datos["tiempo_max_ms"] = round(datos["tiempo_max_ms"], 3)
+            datos["tiempo_medio_ms"] = round(
+                datos["tiempo_total_ms"] / datos["llamadas"], 3
+            )
+        return filas[:limite] if limite else filas
+
+    def reiniciar(self) -> None:
+        """Descarta todas las estadísticas acumuladas."""
+        with self._lock:
+            self._datos.clear()
+
+    def volcar(self, ruta: str) -> None:
+        """Escribe el resumen completo en `ruta` como JSON."""
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(self.resumen(), f, ensure_ascii=False, indent=2)
+
+
+ESTADISTICAS = EstadisticasSQL()
+
+
+class CursorPerfilado(sqlite3.Cursor):
+    """Cursor que mide cada llamada desde `execute` hasta la siguiente o el cierre."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._llamada: Optional[Dict[str, Any]] = None
+
+    def _medir(self, metodo, *args):
+        conn = self.connection
+        pasos_previos = conn.pasos_vm
+        conn.en_cursor += 1
+        inicio = time.perf_counter()
+        try:
+            return metodo(*args)
+        finally:
+            if self._llamada is not None:
+                self._llamada["segundos"] += time.perf_counter() - inicio
+                self._llamada["pasos"] += conn.pasos_vm - pasos_previos
+            conn.en_cursor -= 1
+
+    def _iniciar_llamada(self, sql: str, params: Any) -> None:
+        self._cerrar_llamada()
+        self._llamada = {
+            "sql": sql,
+            "params": params,
+            "segundos": 0.0,
+            "filas": 0,
+            "pasos": 0,
+        }
+
+    def _cerrar_llamada(self, con_plan: bool = True) -> None:
+        llamada, self._llamada = self._llamada, None
+        if llamada is None:
+            return
+        if self.description is None and self.rowcount > 0:
+            llamada["filas"] = self.rowcount
+        ESTADISTICAS.registrar(
+            llamada["sql"], llamada["segundos"], llamada["filas"], llamada["pasos"]
+        )
+        ms = llamada["segundos"] * 1000
+        if ms >= UMBRAL_LENTO_MS:
+            plan = (
+                self.connection.plan_consulta(llamada["sql"], llamada["params"])
+                if con_plan
+                else []
+            )
+            logger.warning(
+                "Consulta lenta (%.1f ms, %d filas): %s | plan: %s",
+                ms,
+                llamada["filas"],
+                normalizar_sql(llamada["sql"]),
+                "; ".join(plan) or "-",
+            )
+
+    def execute(self, sql, parameters=()):
+        """Ejecuta la sentencia iniciando una nueva llamada medida."""
+        self._iniciar_llamada(sql, parameters)
+        self._medir(super().execute, sql, parameters)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        """Ejecuta la sentencia para cada fila de parámetros como una sola llamada."""
+        self._iniciar_llamada(sql, None)
+        self._medir(super().executemany, sql, self._capturar_primero(seq_of_parameters))
+        return self
+
+    def _capturar_primero(self, filas: Iterable[Any]) -> Iterator[Any]:
+        """Deja pasar los parámetros guardando el primero para el plan de consulta."""
+        for indice, fila in enumerate(filas):
+            if indice == 0 and self._llamada is not None:
+                self._llamada["params"] = fila
+            yield fila
+
+    def fetchone(self):
+        """Lee una fila sumando su tiempo y la fila a la llamada actual."""
+        fila = self._medir(super().fetchone)
+        if fila is not None and self._llamada is not None:
+            self._llamada["filas"] += 1
+        return fila
+
+    def fetchmany(self, size=None):
+        """Lee varias filas sumando su tiempo y las filas a la llamada actual."""
+        filas = self._medir(
+            super().fetchmany, self.arraysize if size is None else size
+        )
+        if self._llamada is not None:
+            self._llamada["filas"] += len(filas)
+        return filas
+
+    def fetchall(self):
+        """Lee todas las filas sumando su tiempo y las filas a la llamada actual."""
+        filas = self._medir(super().fetchall)
+        if self._llamada is not None:
+            self._llamada["filas"] += len(filas)
+        return filas
+
+    def __next__(self):
+        fila = self._medir(super().__next__)
+        if self._llamada is not None:
+            self._llamada["filas"] += 1
+        return fila
+
+    def close(self):
+        """Registra la llamada pendiente y cierra el cursor."""
+        self._cerrar_llamada()
+        super().close()
+
+    def __del__(self):
+        # Cursores temporales (p. ej. de `conn.execute`) que nadie cerró.
+        try:
+            self._cerrar_llamada(con_plan=False)
+        except sqlite3.Error:
+            pass
+
+
+class ConexionPerfilada(sqlite3.Connection):
+    """Conexión SQLite que instrumenta sus sentencias con `CursorPerfilado`."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.pasos_vm = 0
+        self.en_cursor = 0
+        self._cursores = weakref.WeakSet()
+        self.set_progress_handler(self._contar_pasos, PASOS_POR_AVISO)
+        self.set_trace_callback(self._trazar)
+
+    def _contar_pasos(self) -> int:
+        self.pasos_vm += PASOS_POR_AVISO
+        return 0
+
+    def _trazar(self, sql: str) -> None:
+        # Las sentencias de los cursores ya se registran con su tiempo.
+        if not self.en_cursor:
+            ESTADISTICAS.registrar(sql, None)
+
+    def plan_consulta(self, sql: str, params: Any) -> List[str]:
+        """
+        Obtiene el ``EXPLAIN QUERY PLAN`` de una sentencia sin registrarlo.
+
+        Args:
+            sql (str): Texto de la sentencia.
+            params (Any): Parámetros con los que se ejecutó.
+
+        Returns:
+            list[str]: El detalle de cada paso del plan, o una lista vacía si
+            la sentencia no admite plan.
+        """
+        if not sql.lstrip().upper().startswith(_SENTENCIAS_CON_PLAN):
+            return []
+        self.en_cursor += 1
+        cursor = super().cursor()
+        try:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params or ())
+            return [fila[3] for fila in cursor.fetchall()]
+        except sqlite3.Error:
+            return []
+        finally:
+            cursor.close()
+            self.en_cursor -= 1
+
+    def cursor(self, factory=CursorPerfilado):
+        """Crea un cursor, perfilado por defecto."""
+        cursor = super().cursor(factory)
+        self._cursores.add(cursor)
+        return cursor
+
+    def execute(self, sql, parameters=()):
+        """Atajo de `execute` que pasa por un cursor perfilado."""
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, parameters):
+        """Atajo de `executemany` que pasa por un cursor perfilado."""
+        return self.cursor().executemany(sql, parameters)
+
+    def close(self):
+        """Registra las llamadas pendientes de sus cursores y cierra la conexión."""
+        for cursor in list(self._cursores):
+            cursor._cerrar_llamada()
+        super().close()
+
+
+if ACTIVO and ARCHIVO_VOLCADO:
+    atexit.register(ESTADISTICAS.volcar, ARCHIVO_VOLCADO)
@@ -1,24 +1,163 @@
 """Utilidades para la gestión de vuelos y reservas."""
 
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 import sqlite3
 import os
+import time
+
+import perfilador
+from fragmentos import fragmento_local, podar_fragmento
+from particiones import (
+    SQL_MES_DE_FECHA,
+    SQL_MES_DE_VUELO,
+    SQL_MESES_NO_INDEXADOS,
+    SQL_VUELO_EN_PRINCIPAL,
+    archivo_adjunto,
+    asegurar_metadatos,
+    esquema_de_vuelo,
+    mes_de_fecha_archivada,
+    mes_de_vuelo_archivado,
+)
 
 
 def conectar_base_datos(
-    nombre_db: str = "vuelos.db", script_sql: str = "inicial.sql"
+    nombre_db: str = os.getenv("VCN_DB", "vuelos.db"), script_sql: str = "inicial.sql"
 ) -> None:
     """
     Crea una base de datos SQLite con las tablas estado_vuelos y reservas solo si no existe.
-    Llena las tablas con datos iniciales desde un archivo .sql.
+    Llena las tablas con datos iniciales desde un archivo .sql; si la instancia
+    es un fragmento (`VCN_FRAGMENTO`), conserva solo los vuelos que le pertenecen.
+    Asegura además las tablas de metadatos del particionado por fecha.
+    Si el perfilador está activo (`VCN_PERFILAR=1`) la conexión se instrumenta.
     """
     if not os.path.exists(nombre_db):
         conn = sqlite3.connect(nombre_db)
         with open(script_sql, "r", encoding="utf-8") as f:
             sql_script = f.read()
         conn.executescript(sql_script)
+        fragmento = fragmento_local()
+        if fragmento is not None:
+            podar_fragmento(conn, *fragmento)
         conn.close()
-    return sqlite3.connect(nombre_db)
+    fabrica = (
+        perfilador.ConexionPerfilada if perfilador.ACTIVO else sqlite3.Connection
+    )
+    conn = sqlite3.connect(nombre_db, factory=fabrica)
+    asegurar_metadatos(conn)
+    return conn
+
+
+# Índices que usan las consultas de este módulo: búsqueda de opciones por ruta
+# y fecha, y reservas por vuelo (asiento libre, verificación, eliminación).
+SQL_INDICES = """
+CREATE INDEX IF NOT EXISTS idx_estado_vuelos_ruta ON estado_vuelos(origen, destino, fecha);
+CREATE INDEX IF NOT EXISTS idx_reservas_vuelo ON reservas(vuelo, numero_asiento);
+"""
+
+# Consultas de lectura de este módulo. `{esquema}` es "main" o el esquema con
+# el que se adjuntó un archivo mensual.
+SQL_ESTADO_VUELO = """SELECT vuelo, estado, origen, destino, fecha, hora
+    FROM {esquema}.estado_vuelos WHERE vuelo = ?"""
+SQL_OPCIONES = """SELECT vuelo, hora, estado FROM {esquema}.estado_vuelos
+    WHERE origen = ? AND destino = ? AND fecha = ?"""
+SQL_ASIENTOS_USADOS = "SELECT numero_asiento FROM {esquema}.reservas WHERE vuelo = ?"
+SQL_ASIENTO_OCUPADO = (
+    "SELECT COUNT(*) FROM reservas WHERE vuelo = ? AND numero_asiento = ?"
+)
+SQL_RESERVA_EXISTE = """SELECT COUNT(*) FROM {esquema}.reservas
+    WHERE vuelo = ? AND numero_asiento = ? AND id_pasajero = ?"""
+SQL_VERIFICAR_RESERVA = """SELECT numero_asiento FROM {esquema}.reservas
+    WHERE vuelo = ? AND id_pasajero = ?"""
+
+# Sentencias que el calentamiento deja preparadas sobre "main", con parámetros
+# que no coinciden con ninguna fila. Se ejecutan con el mismo texto que usan
+# las funciones, que es la clave de la caché de sentencias de la conexión.
+SENTENCIAS_CALIENTES = (
+    (SQL_ESTADO_VUELO, ("",)),
+    (SQL_OPCIONES, ("", "", "")),
+    (SQL_ASIENTOS_USADOS, ("",)),
+    (SQL_ASIENTO_OCUPADO, ("", 0)),
+    (SQL_RESERVA_EXISTE, ("", 0, "")),
+    (SQL_VERIFICAR_RESERVA, ("", "")),
+    (SQL_MES_DE_VUELO, ("",)),
+    (SQL_MES_DE_FECHA, ("", "")),
+    (SQL_VUELO_EN_PRINCIPAL, ("",)),
+    (SQL_MESES_NO_INDEXADOS, ()),
+)
+
+# Índices que recorre el calentamiento, como (tabla, índice, columna del
+# índice): los de SQL_INDICES y la clave primaria por la que se busca un
+# vuelo. Se cuenta una columna del índice (y no `count(*)`, que SQLite
+# resuelve con el índice más pequeño) para que el recorrido sea por ese índice.
+INDICES_CALIENTES = (
+    ("estado_vuelos", "idx_estado_vuelos_ruta", "origen"),
+    ("estado_vuelos", "sqlite_autoindex_estado_vuelos_1", "vuelo"),
+    ("reservas", "idx_reservas_vuelo", "numero_asiento"),
+)
+
+_conexion: Optional[sqlite3.Connection] = None
+
+
+def obtener_conexion() -> sqlite3.Connection:
+    """
+    Devuelve la conexión compartida del proceso, abriéndola la primera vez.
+
+    Reutilizar la conexión conserva la caché de páginas de SQLite y las
+    sentencias ya preparadas entre llamadas. Las herramientas MCP síncronas se
+    ejecutan en el hilo del bucle de eventos, por lo que nunca se usa en paralelo.
+
+    Returns:
+        sqlite3.Connection: Conexión a la base de datos del proceso.
+    """
+    global _conexion
+    if _conexion is None:
+        _conexion = conectar_base_datos()
+    return _conexion
+
+
+def calentar_base_datos(conn: sqlite3.Connection) -> Dict[str, float]:
+    """
+    Prepara la conexión para que la primera consulta real sea tan rápida como las siguientes.
+
+    Crea los índices si faltan, ejecuta una vez cada consulta de lectura de
+    `SENTENCIAS_CALIENTES` (sin escribir nada y sin adjuntar archivos) para
+    dejarla compilada en la caché de sentencias de la conexión, y recorre los
+    índices de esas consultas para cargar sus páginas en memoria. Las tablas
+    no se leen enteras: con un ``count`` sobre cada índice solo se tocan sus
+    páginas y no se copia ninguna fila a Python. Las sentencias de escritura
+    no se preparan, para no abrir transacciones de escritura al arrancar.
+
+    Args:
+        conn (sqlite3.Connection): Conexión a calentar.
+
+    Returns:
+        dict: Milisegundos empleados en cada fase.
+    """
+    tiempos = {}
+
+    inicio = time.perf_counter()
+    conn.executescript(SQL_INDICES)
+    tiempos["indices"] = (time.perf_counter() - inicio) * 1000
+
+    cursor = conn.cursor()
+    try:
+        inicio = time.perf_counter()
+        for sql, params in SENTENCIAS_CALIENTES:
+            cursor.execute(sql.format(esquema="main"), params)
+            cursor.fetchall()
+        tiempos["sentencias"] = (time.perf_counter() - inicio) * 1000
+
+        inicio = time.perf_counter()
+        for tabla, indice, columna in INDICES_CALIENTES:
+            cursor.execute(
+                f"SELECT count({columna}) FROM {tabla} INDEXED BY {indice}"
+            )
+            cursor.fetchone()
+        tiempos["cache"] = (time.perf_counter() - inicio) * 1000
+    finally:
+        cursor.close()
+
+    return {fase: round(ms, 3) for fase, ms in tiempos.items()}
 
 
 def consulta_estado_vuelo(
@@ -27,6 +166,8 @@ def consulta_estado_vuelo(
     """
     Consulta el estado de un vuelo dado su número, obteniendo los datos desde la base de datos.
 
+    Si el vuelo no está en la base principal se busca en su archivo mensual.
+
     Args:
         numero_vuelo (str): El número del vuelo a consultar.
         conn (sqlite3.Connection): Conexión a la base de datos.
@@ -37,14 +178,21 @@ def consulta_estado_vuelo(
     cursor = conn.cursor()
     try:
         # Usar parámetros en la consulta evita que valores como PSO se interpreten como columnas
-        cursor.execute(
-            """SELECT vuelo, estado, origen, destino, fecha, hora
-         FROM estado_vuelos WHERE vuelo = ?""",
-            (numero_vuelo,),
-        )
+        cursor.execute(SQL_ESTADO_VUELO.format(esquema="main"), (numero_vuelo,))
         resultado = cursor.fetchone()
     finally:
         cursor.close()
+    if not resultado:
+        with esquema_de_vuelo(numero_vuelo, conn) as esquema:
+            if esquema != "main":
+                cursor = conn.cursor()
+                try:
+                    cursor.execute(
+                        SQL_ESTADO_VUELO.format(esquema=esquema), (numero_vuelo,)
+                    )
+                    resultado = cursor.fetchone()
+                finally:
+                    cursor.close()
     if resultado:
         vuelo, estado, origen, destino, fecha, hora = resultado
     else:
@@ -68,28 +216,14 @@ def consulta_estado_vuelo(
     return estado_vuelo
 
 
-def consultar_opciones_vuelo(
-    origen: str, destino: str, fecha: str, conn: sqlite3.Connection
-) -> Dict[str, Any]:
-    """
-    Consulta las opciones de vuelo disponibles entre un origen y un destino en una fecha dada.
-
-    Args:
-        origen (str): Ciudad de origen.
-        destino (str): Ciudad de destino.
-        fecha (str): Fecha del vuelo en formato 'YYYY-MM-DD'.
-        conn (sqlite3.Connection): Conexión a la base de datos.
-
-    Returns:
-        dict: Un diccionario con las opciones de vuelo disponibles.
-    """
+def _opciones_en_esquema(
+    origen: str, destino: str, fecha: str, conn: sqlite3.Connection, esquema: str
+) -> List[Dict[str, Any]]:
+    """Calcula las opciones de vuelo usando las tablas del esquema indicado."""
     cursor = conn.cursor()
     try:
         cursor.execute(
-            """SELECT vuelo, hora, estado
-         FROM estado_vuelos
-         WHERE origen = ? AND destino = ? AND fecha = ?""",
-            (origen, destino, fecha),
+            SQL_OPCIONES.format(esquema=esquema), (origen, destino, fecha)
         )
         resultados = cursor.fetchall()
     finally:
@@ -102,10 +236,7 @@ def consultar_opciones_vuelo(
     for vuelo, hora, estado in resultados:
         c2 = conn.cursor()
         try:
-            c2.execute(
-                "SELECT numero_asiento FROM reservas WHERE vuelo = ?",
-                (vuelo,),
-            )
+            c2.execute(SQL_ASIENTOS_USADOS.format(esquema=esquema), (vuelo,))
             usados = {row[0] for row in c2.fetchall()}
         finally:
             c2.close()
@@ -124,6 +255,32 @@ def consultar_opciones_vuelo(
                 "numero_asiento": asiento_disponible,
             }
         )
+    return opciones
+
+
+def consultar_opciones_vuelo(
+    origen: str, destino: str, fecha: str, conn: sqlite3.Connection
+) -> Dict[str, Any]:
+    """
+    Consulta las opciones de vuelo disponibles entre un origen y un destino en una fecha dada.
+
+    Solo se adjunta el archivo mensual cuando la fecha cae dentro de lo ya
+    archivado; las consultas de hoy y fechas futuras usan solo la base principal.
+
+    Args:
+        origen (str): Ciudad de origen.
+        destino (str): Ciudad de destino.
+        fecha (str): Fecha del vuelo en formato 'YYYY-MM-DD'.
+        conn (sqlite3.Connection): Conexión a la base de datos.
+
+    Returns:
+        dict: Un diccionario con las opciones de vuelo disponibles.
+    """
+    opciones = _opciones_en_esquema(origen, destino, fecha, conn, "main")
+    mes = mes_de_fecha_archivada(fecha, conn)
+    if mes:
+        with archivo_adjunto(mes, conn) as esquema:
+            opciones += _opciones_en_esquema(origen, destino, fecha, conn, esquema)
 
     return {"origen": origen, "destino": destino, "fecha": fecha, "opciones": opciones}
 
@@ -143,13 +300,14 @@ def reservar_asiento(
     Returns:
         dict: Un diccionario con el resultado de la reserva.
     """
+    # Los vuelos archivados ya partieron: no admiten nuevas reservas
+    if mes_de_vuelo_archivado(vuelo, conn):
+        return {"error": "Vuelo archivado"}
+
     cursor = conn.cursor()
     try:
         # Verificar si el asiento ya está reservado
-        cursor.execute(
-            "SELECT COUNT(*) FROM reservas WHERE vuelo = ? AND numero_asiento = ?",
-            (vuelo, numero_asiento),
-        )
+        cursor.execute(SQL_ASIENTO_OCUPADO, (vuelo, numero_asiento))
         if cursor.fetchone()[0] > 0:
             return {"error": "Asiento ya reservado"}
 
@@ -186,36 +344,35 @@ def eliminar_reserva(
     Returns:
         dict: Un diccionario con el resultado de la eliminación de la reserva.
     """
-    cursor = conn.cursor()
-    try:
-        # Verificar si la reserva existe
-        cursor.execute(
-            """SELECT COUNT(*) 
-            FROM reservas 
-            WHERE vuelo = ? 
-            AND numero_asiento = ? 
-            AND id_pasajero = ?""",
-            (vuelo, numero_asiento, id_pasajero),
-        )
-        if cursor.fetchone()[0] == 0:
-            return {"error": "Reserva no encontrada"}
+    with esquema_de_vuelo(vuelo, conn) as esquema:
+        cursor = conn.cursor()
+        try:
+            # Verificar si la reserva existe
+            cursor.execute(
+                SQL_RESERVA_EXISTE.format(esquema=esquema),
+                (vuelo, numero_asiento, id_pasajero),
+            )
+            if cursor.fetchone()[0] == 0:
+                return {"error": "Reserva no encontrada"}
 
-        # Eliminar la reserva
-        cursor.execute(
-            "DELETE FROM reservas WHERE vuelo = ? AND numero_asiento = ? AND id_pasajero = ?",
-            (vuelo, numero_asiento, id_pasajero),
-        )
-        conn.commit()
-        return {
-            "vuelo": vuelo,
-            "asiento": numero_asiento,
-            "id_pasajero": id_pasajero,
-            "estado": "Reserva eliminada",
-        }
-    except sqlite3.IntegrityError as e:
-        return {"error": str(e)}
-    finally:
-        cursor.close()
+            # Eliminar la reserva
+            cursor.execute(
+                f"""DELETE FROM {esquema}.reservas
+                WHERE vuelo = ? AND numero_asiento = ? AND id_pasajero = ?""",
+                (vuelo, numero_asiento, id_pasajero),
+            )
+            conn.commit()
+            return {
+                "vuelo": vuelo,
+                "asiento": numero_asiento,
+                "id_pasajero": id_pasajero,
+                "estado": "Reserva eliminada",
+            }
+        except sqlite3.IntegrityError as e:
+            conn.rollback()
+            return {"error": str(e)}
+        finally:
+            cursor.close()
 
 def verificar_reserva(
     vuelo: str, id_pasajero: str, conn: sqlite3.Connection
@@ -231,18 +388,15 @@ def verificar_reserva(
     Returns:
         dict: Un diccionario con el resultado de la verificación de la reserva.
     """
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
-            """SELECT numero_asiento 
-            FROM reservas 
-            WHERE vuelo = ? 
-            AND id_pasajero = ?""",
-            (vuelo, id_pasajero),
-        )
-        resultado = cursor.fetchone()
-    finally:
-        cursor.close()
+    with esquema_de_vuelo(vuelo, conn) as esquema:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                SQL_VERIFICAR_RESERVA.format(esquema=esquema), (vuelo, id_pasajero)
+            )
+            resultado = cursor.fetchone()
+        finally:
+            cursor.close()
 
     if resultado:
         numero_asiento = resultado[0]